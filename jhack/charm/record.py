@@ -61,7 +61,10 @@ class Recorder:
         app = self._app
         for relation in get_relations(model):
             logger.debug(f"found relation {relation}")
-            if relation.requirer.split(":")[0] == app or relation.provider.split(":")[0] == app:
+            if (
+                relation.requirer.partition(":")[0] == app
+                or relation.provider.partition(":")[0] == app
+            ):
                 relation_data = get_relation_data(
                     provider_endpoint=relation.provider,
                     requirer_endpoint=relation.requirer,
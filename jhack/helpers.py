@@ -11,8 +11,18 @@ from dataclasses import dataclass
 from functools import lru_cache
 from itertools import chain
 from pathlib import Path
-from subprocess import PIPE, CalledProcessError, check_call, check_output
-from typing import Callable, Dict, List, Literal, Optional, Sequence, Tuple, Union
+from subprocess import DEVNULL, PIPE, CalledProcessError, check_call, check_output
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import typer
 import yaml
@@ -20,6 +30,12 @@ import yaml
 from jhack.config import IS_SNAPPED
 from jhack.logger import logger
 
+try:
+    # optional (`pip install jhack[fast]`): parses juju's (large) json output faster
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 try:
     from enum import StrEnum
 except ImportError:
@@ -146,27 +162,56 @@ def juju_status(app_name=None, model: str = None, json: bool = False):
     if json:
         cmd += " --format json"
     proc = JPopen(cmd.split())
-    raw = proc.stdout.read().decode("utf-8")
+    # communicate() also waits for juju, so we don't leave the process around
+    raw, _ = proc.communicate()
 
     if not raw:
-        logger.error(f"{cmd} produced no output.")
-        if model:
-            logger.error(
-                f"This usually means that the model {model!r} you passed does not exist"
-            )
-        else:
-            logger.error("This usually means that the juju client isn't reachable")
+        _raise_status_error(cmd, model)
 
-        if IS_SNAPPED:
-            logger.warning(
-                "double-check that the jhack:dot-local-share-juju plug is connected to snapd."
-            )
+    if json:
+        # both json parsers take bytes, no need to decode first
+        return json_loads(raw)
+    return raw.decode("utf-8")
 
-        raise GetStatusError("unable to fetch juju status (see logs)")
 
-    if json:
-        return jsn.loads(raw)
-    return raw
+def juju_status_lines(app_name=None, model: str = None) -> Iterator[str]:
+    """Like juju_status, but yields the tabular status line by line as juju produces it.
+
+    Raises GetStatusError right away if juju produces no output at all.
+    """
+    cmd = f'juju status{" " + app_name if app_name else ""} --relations'
+    if model:
+        cmd += f" -m {model}"
+    # nobody reads stderr while we stream stdout: if juju is chatty, a full stderr pipe
+    # would block it (and us) forever
+    proc = JPopen(cmd.split(), text=True, stderr=DEVNULL)
+
+    first_line = proc.stdout.readline()
+    if not first_line:
+        proc.wait()
+        _raise_status_error(cmd, model)
+
+    def _lines():
+        yield first_line
+        yield from proc.stdout
+        proc.wait()
+
+    return _lines()
+
+
+def _raise_status_error(cmd: str, model: Optional[str]):
+    logger.error(f"{cmd} produced no output.")
+    if model:
+        logger.error(f"This usually means that the model {model!r} you passed does not exist")
+    else:
+        logger.error("This usually means that the juju client isn't reachable")
+
+    if IS_SNAPPED:
+        logger.warning(
+            "double-check that the jhack:dot-local-share-juju plug is connected to snapd."
+        )
+
+    raise GetStatusError("unable to fetch juju status (see logs)")
 
 
 @lru_cache
@@ -235,14 +280,14 @@ def show_unit(unit: str, model: str = None):
     cmd = f"juju show-unit {_model}{unit} --format json".split()
     logger.debug(cmd)
     proc = JPopen(cmd)
-    raw = json.loads(proc.stdout.read().decode("utf-8"))
+    raw = json_loads(proc.communicate()[0])
     return raw[unit]
 
 
 def show_application(application: str, model: str = None):
     _model = f"-m {model} " if model else ""
-    proc = JPopen(f"juju show-application {application} --format json".split())
-    raw = json.loads(proc.stdout.read().decode("utf-8"))
+    proc = JPopen(f"juju show-application {_model}{application} --format json".split())
+    raw = json_loads(proc.communicate()[0])
     return raw[application]
 
 
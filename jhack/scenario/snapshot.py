@@ -43,6 +43,12 @@ from jhack.scenario.integrations.darkroom import ops_port_to_scenario
 from jhack.scenario.state_to_dict import state_to_dict
 from jhack.scenario.utils import JujuUnitName
 
+try:
+    # libyaml bindings, if pyyaml was built with them: much faster on juju's yaml output
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 logger = jhack_root_logger.getChild(__file__)
 
 JUJU_RELATION_KEYS = frozenset({"egress-subnets", "ingress-address", "private-address"})
@@ -232,7 +238,7 @@ def get_leader(target: JujuUnitName, model: Optional[str]):
 def get_network(target: JujuUnitName, model: Optional[str], endpoint: str) -> Network:
     """Get the Network data structure for this endpoint."""
     raw = _juju_exec(target, model, f"network-get {endpoint}")
-    json_data = yaml.safe_load(raw)
+    json_data = yaml.load(raw, Loader=SafeLoader)
 
     bind_addresses = []
     for raw_bind in json_data["bind-addresses"]:
@@ -308,7 +314,7 @@ def get_metadata(target: JujuUnitName, model: Model):
         f"cat {meta_path}",
         model=model.name,
     )
-    return yaml.safe_load(raw_meta)
+    return yaml.load(raw_meta, Loader=SafeLoader)
 
 
 class RemotePebbleClient:
@@ -353,7 +359,7 @@ class RemotePebbleClient:
 
     def get_plan(self) -> dict:
         plan_raw = self._run("plan")
-        return yaml.safe_load(plan_raw)
+        return yaml.load(plan_raw, Loader=SafeLoader)
 
     def pull(
         self,
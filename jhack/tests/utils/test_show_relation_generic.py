@@ -5,6 +5,9 @@ from jhack.utils.show_relation import (
     RelationEndpointURL,
     RelationType,
     _match_endpoint,
+    _parse_relations_table,
+    _watch_interval,
+    purge,
 )
 
 
@@ -138,3 +141,49 @@ def test_match_endpoint_peer_underspecified_endpoint(unit, endpoint1, endpoint2,
     rep1 = RelationEndpointURL(ep1)
     rep2 = RelationEndpointURL(ep2) if ep2 else None
     assert _match_endpoint(rel, rep1, rep2) == (match, flip)
+
+
+@pytest.mark.parametrize("header", ("Relation provider", "Integration provider"))
+def test_parse_relations_table(header):
+    status = f"""
+Unit           Workload  Agent  Address     Ports  Message
+kratos/0*      active    idle   10.1.64.94
+
+{header}         Requirer                   Interface          Type     Message
+postgresql:database        kratos:pg-database         postgresql_client  regular  joining
+postgresql:database-peers  postgresql:database-peers  postgresql_peers   peer
+
+Storage Unit  Storage ID  Type  Pool  Mountpoint  Size  Status  Message
+"""
+    assert _parse_relations_table(status) == [
+        Relation(
+            "postgresql", "database", "kratos", "pg-database", "postgresql_client", "regular"
+        ),
+        Relation(
+            "postgresql",
+            "database-peers",
+            "postgresql",
+            "database-peers",
+            "postgresql_peers",
+            "peer",
+        ),
+    ]
+
+
+def test_purge_does_not_mutate():
+    data = {"foo": "bar", "ingress-address": "10.0.0.1", "private-address": "10.0.0.1"}
+    assert purge(data) == {"foo": "bar"}
+    assert len(data) == 3
+
+
+@pytest.mark.parametrize(
+    "render_time, interval, expected",
+    (
+        (0.1, None, 0.5),
+        (1, None, 1.5),
+        (10, None, 5),
+        (10, 2, 2),
+    ),
+)
+def test_watch_interval(render_time, interval, expected):
+    assert _watch_interval(render_time, interval) == expected
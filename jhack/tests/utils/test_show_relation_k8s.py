@@ -1,5 +1,6 @@
 import json as json_
 import sys
+from dataclasses import replace
 from pathlib import Path
 from textwrap import dedent
 from unittest.mock import patch
@@ -8,7 +9,14 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 import pytest
 
-from jhack.utils.show_relation import _coalesce_endpoint_and_n, _sync_show_relation
+from jhack.utils.show_relation import (
+    Relation,
+    RelationEndpointURL,
+    _coalesce_endpoint_and_n,
+    _get_metadata,
+    _sync_show_relation,
+    get_content,
+)
 
 
 def fake_juju_status(model=None, json: bool = False):
@@ -96,3 +104,37 @@ def test_coalesce(
         ep1, ep2, relation = _coalesce_endpoint_and_n(ep1, ep2, None, None)
 
     assert relation.interface == expected_interface_name
+
+
+@pytest.mark.parametrize(
+    "relation",
+    (
+        Relation(
+            "traefik", "ingress-per-unit", "prometheus", "ingress", "ingress_per_unit", "regular"
+        ),
+        Relation(
+            "prometheus",
+            "prometheus-peers",
+            "prometheus",
+            "prometheus-peers",
+            "prometheus_peers",
+            "peer",
+        ),
+    ),
+)
+def test_get_content_scaled_to_zero(relation):
+    # prometheus' metadata from the status mock, as it would look after `juju scale 0`
+    meta = _get_metadata("prometheus", None)
+    with patch(
+        "jhack.utils.show_relation.get_units_and_meta",
+        return_value=((), replace(meta, scale=0, units=())),
+    ):
+        content = get_content(
+            RelationEndpointURL("prometheus"),
+            RelationEndpointURL(relation.provider),
+            relation,
+        )
+
+    assert content.units_data == {}
+    assert content.application_data is None
+    assert content.relation_id is None
@@ -1,10 +1,9 @@
 import re
-import signal
-from contextlib import contextmanager
 from dataclasses import dataclass
 from multiprocessing.pool import ThreadPool
-from time import sleep
-from typing import Callable, List, Literal, Optional
+from subprocess import PIPE
+from time import monotonic
+from typing import Callable, List, Literal, Optional, Tuple
 
 import typer
 from rich.align import Align
@@ -18,7 +17,7 @@ from jhack.helpers import (
     JPopen,
     get_current_model,
     get_models,
-    juju_status,
+    juju_status_lines,
 )
 from jhack.logger import logger
 
@@ -27,6 +26,8 @@ logger = logger.getChild("nuke")
 ASK_FOR_CONFIRMATION = CONFIG.get("nuke", "ask_for_confirmation")
 GENTLY = CONFIG.get("nuke", "gently")
 BLINK = CONFIG.get("nuke", "blink")
+# how long (in seconds) we wait for the nukes to land before reporting what's still in flight
+NUKE_TIMEOUT = 1
 
 _Color = Optional[Literal["auto", "standard", "256", "truecolor", "windows", "no"]]
 ATOM = "⚛"
@@ -69,27 +70,6 @@ NUKE_GENTLY_ASCII_ART = """
 """
 
 
-class TimeoutException(Exception):
-    pass
-
-
-@contextmanager
-def timeout(seconds, raise_=False):
-    def signal_handler(signum, frame):
-        raise TimeoutException("Timed out!")
-
-    signal.signal(signal.SIGALRM, signal_handler)
-    signal.alarm(seconds)
-    try:
-        yield
-    except TimeoutException as e:
-        if raise_:
-            raise e
-        return None
-    finally:
-        signal.alarm(0)
-
-
 @dataclass
 class Endpoints:
     provider: str
@@ -120,26 +100,26 @@ def _get_apps_and_relations(
     model: Optional[str],
     borked: bool,
     filter_: Callable[[str], bool],
+    literal_prefix: str = "",
     include_apps: bool = True,
     include_relations: bool = True,
 ) -> List[Nukeable]:
     logger.info("gathering apps and relations")
 
     try:
-        status = juju_status("", model)
+        # stream the status so we can start parsing before juju is done printing it
+        status_lines = juju_status_lines(model=model)
     except GetStatusError:
         logger.error(
             f"nuke attempted to get the status of {model} but the model is probably dead already."
         )
         return []
 
-    if not status:
-        return []
-
     apps = 0
     relation = 0
     nukeables = []
-    for line in status.split("\n"):
+    for line in status_lines:
+        line = line.rstrip("\n")
         if line.startswith("App "):
             apps = 1
             continue
@@ -158,7 +138,9 @@ def _get_apps_and_relations(
 
         logger.debug(f"checking {line}")
         if apps and include_apps:
-            logger.debug(f"checking {line}")
+            if literal_prefix and not line.startswith(literal_prefix):
+                logger.debug("skipping app not matching the target prefix")
+                continue
             if borked and "active" in line:
                 logger.debug("skipping non-borked app")
                 continue
@@ -174,6 +156,10 @@ def _get_apps_and_relations(
                 logger.debug(f"nukeable skipped: {entity_name} (app)")
 
         if relation and include_relations:
+            # either endpoint could match, but at least one has to contain the prefix
+            if literal_prefix and literal_prefix not in line:
+                logger.debug("skipping relation not matching the target prefix")
+                continue
             prov, req, *_ = re.split(r"\s+", line)
             eps = Endpoints(prov.strip(), req.strip())
             if filter_(eps.provider) or filter_(eps.requirer):
@@ -185,18 +171,19 @@ def _get_apps_and_relations(
     return nukeables
 
 
-def _gather_nukeables(
-    obj: Optional[str],
-    model: Optional[str],
-    borked: bool,
-    selectors: str = "",
-    cur_model: Optional[str] = None,
-):
-    logger.debug(f"Gathering nukeables for {obj!r} with _selectors = {selectors!r}")
+def _compile_glob(obj: str) -> Tuple[Callable[[str], bool], str]:
+    """Compile a nuke target pattern to a filter function.
+
+    Also returns the literal prefix every match has to start with, if there is one
+    (empty string otherwise), so callers can cheaply discard candidates before filtering.
+    """
 
     def globber(s):
         return s.startswith(obj)
 
+    # no target pattern, no prefix to filter on
+    literal_prefix = obj or ""
+
     if isinstance(obj, str) and ("*" in obj or "!" in obj):
         logger.info("globbing detected; analyzing pattern")
 
@@ -208,6 +195,8 @@ def _gather_nukeables(
             def globber(s):  # noqa: F811
                 return obj.strip("!") == s
 
+            literal_prefix = obj.strip("!")
+
         elif "!" in obj:
             raise RuntimeError("! is only supported at the start of the name.")
 
@@ -216,18 +205,37 @@ def _gather_nukeables(
             def globber(s):
                 return obj.strip("*") in s
 
+            literal_prefix = ""
+
         elif obj.startswith("*"):
 
             def globber(s):
                 return s.endswith(obj.strip("*"))
 
+            literal_prefix = ""
+
         elif obj.endswith("*"):
 
             def globber(s):
                 return s.startswith(obj.strip("*"))
 
+            literal_prefix = obj.strip("*")
+
         obj = obj.strip("*!")
 
+    return globber, literal_prefix
+
+
+def _gather_nukeables(
+    obj: Optional[str],
+    model: Optional[str],
+    borked: bool,
+    selectors: str = "",
+    cur_model: Optional[str] = None,
+):
+    logger.debug(f"Gathering nukeables for {obj!r} with _selectors = {selectors!r}")
+    globber, literal_prefix = _compile_glob(obj)
+
     nukeables: List[Nukeable] = []
 
     if "a" in selectors or "r" in selectors:
@@ -237,6 +245,7 @@ def _gather_nukeables(
                 model or cur_model,
                 borked=borked,
                 filter_=globber,
+                literal_prefix=literal_prefix,
                 include_apps="a" in selectors,
                 include_relations="r" in selectors,
             )
@@ -254,6 +263,18 @@ def _gather_nukeables(
     return nukeables
 
 
+def _format_nuke(kind: str, name: str, politeness: str) -> str:
+    """Build the juju command that will nuke this (kind, name) nukeable."""
+    if kind == "model":
+        return f"juju destroy-model{politeness} --destroy-storage --no-prompt {name}"
+    elif kind == "app":
+        return f"juju remove-application {name}{politeness} --no-prompt"
+    elif kind == "relation":
+        # relation nukeables are named "<provider> <requirer>"
+        return f"juju remove-relation {name}"
+    raise ValueError(kind)
+
+
 def _nuke(
     obj: Optional[str],
     model: Optional[str] = None,
@@ -306,42 +327,42 @@ def _nuke(
         logger.debug(f"Gathered: {nukeables}")
 
     politeness = " --force --no-wait" if not gently else ""
-    nukes = []
+    nukes: List[Tuple[str, str]] = []
     nuked_apps = set()
     nuked_models = set()
+    # single pass: collect the nukeables we keep instead of list.remove()-ing
+    # the skipped ones, which would be quadratic on large models.
+    kept_nukeables = []
 
-    for nukeable in tuple(nukeables):
+    for nukeable in nukeables:
         logger.info(f"collecting for nukage: {nukeable}")
         if nukeable.type == "model":
             nuked_models.add(nukeable.name)
-            nukes.append(
-                f"juju destroy-model{politeness} " f"--destroy-storage --no-prompt {nukeable.name}"
-            )
 
         elif nukeable.type == "app":
             nuked_apps.add(nukeable.name)
 
             assert nukeable.model, f"app {nukeable.name} has unknown model"
             if nukeable.model in nuked_models:
-                nukeables.remove(nukeable)
                 continue
 
-            nukes.append(f"juju remove-application {nukeable.name}{politeness} --no-prompt")
-
         elif nukeable.type == "relation":
             # if we're already nuking either app, let's skip nuking the relation
             assert nukeable.endpoints, f"relation {nukeable.name} has unknown endpoints"
-            provider = nukeable.endpoints.provider
-            requirer = nukeable.endpoints.requirer
-            if provider.split(":")[0] in nuked_apps or requirer.split(":")[0] in nuked_apps:
-                nukeables.remove(nukeable)
+            provider_app = nukeable.endpoints.provider.partition(":")[0]
+            requirer_app = nukeable.endpoints.requirer.partition(":")[0]
+            if provider_app in nuked_apps or requirer_app in nuked_apps:
                 continue
 
-            nukes.append(f"juju remove-relation {provider} {requirer}")
-
         else:
             raise ValueError(nukeable.type)
 
+        kept_nukeables.append(nukeable)
+        # the command itself is only formatted when it's needed, see _format_nuke
+        nukes.append((nukeable.type, nukeable.name))
+
+    nukeables = kept_nukeables
+
     if n is not None:
         if n != (real_n := len(nukeables)):
             logger.debug(f"Unexpected number of nukeables; " f"expected {n}, got: {nukeables}")
@@ -362,12 +383,12 @@ def _nuke(
 
     if dry_run:
         for nukeable, nuke in zip(nukeables, nukes):
-            print(f"would {ATOM} {nukeable} with {nuke}")
+            print(f"would {ATOM} {nukeable} with {_format_nuke(*nuke, politeness)}")
         return
 
     if ASK_FOR_CONFIRMATION:
         print("Are you sure you want to nuke:")
-        for nukeable, nuke in zip(nukeables, nukes):
+        for nukeable in nukeables:
             print(f"\t{ATOM} {nukeable}")
 
         try:
@@ -378,7 +399,9 @@ def _nuke(
             print("\nAborted.")
             return
     else:
-        check_destructive_commands_allowed("nuke", "\t\n".join(nukes))
+        check_destructive_commands_allowed(
+            "nuke", "\t\n".join(_format_nuke(*nuke, politeness) for nuke in nukes)
+        )
 
     if color == "no":
         color = None
@@ -388,8 +411,9 @@ def _nuke(
     def print_centered(s):
         return console.print(Align(s, align="center"))
 
-    def fire(nukeable: Nukeable, nuke: str):
+    def fire(nukeable: Nukeable, nuke: Tuple[str, str]):
         """defcon 5"""
+        cmd = _format_nuke(*nuke, politeness)
         _atom = Style(bold=True, color="green")
 
         nukeable_name = nukeable.name
@@ -402,16 +426,15 @@ def _nuke(
         print_centered(text)
 
         # todo split model nukes to a separate process and pass there shell=True
-        logger.debug(f"nuking {nukeable} with {nuke}")
-        proc = JPopen(nuke.split(" "))
-        proc.wait()
-        while proc.returncode is None:
-            sleep(0.1)
+        logger.debug(f"nuking {nukeable} with {cmd}")
+        proc = JPopen(cmd.split(" "), stdout=PIPE, stderr=PIPE)
+        # communicate() drains both pipes while waiting, so a chatty juju can't deadlock us
+        stdout, stderr = proc.communicate()
         if proc.returncode != 0:
             print(
                 f"something went wrong nuking {nukeable.name};"
-                f'stdout={proc.stdout.read().decode("utf-8")}'
-                f'stderr={proc.stderr.read().decode("utf-8")}'
+                f'stdout={stdout.decode("utf-8")}'
+                f'stderr={stderr.decode("utf-8")}'
             )
         else:
             logger.debug("hit and sunk")
@@ -431,16 +454,21 @@ def _nuke(
         res = tp.apply_async(fire, (nukeable, nuke))
         results.append((res, nukeable, nuke))
 
-    with timeout(1):
-        tp.close()
-        tp.join()
+    tp.close()
+    # one shared deadline for all nukes; unlike SIGALRM, this works off the main thread too
+    deadline = monotonic() + NUKE_TIMEOUT
+    for res, _, _ in results:
+        res.wait(max(0.0, deadline - monotonic()))
 
     for res, nkbl, nk in results:
         if not res.ready():
             print_centered(f"{ICBM} {nkbl} still in flight")
         else:
             if not res.successful():
-                print_centered(f"nuke {nk!r} {ICBM} {nkbl!r} failed; someone doesn't want to die")
+                nk_cmd = _format_nuke(*nk, politeness)
+                print_centered(
+                    f"nuke {nk_cmd!r} {ICBM} {nkbl!r} failed; someone doesn't want to die"
+                )
 
     if not dry_run:
         print_centered(Text("✞ RIP ✞", style=Style(bold=True, dim=True)))
@@ -1,12 +1,11 @@
-import csv
+import asyncio
+import os
 import subprocess
 import sys
+from functools import lru_cache
 from json import dumps as json_dumps
 from json import loads as json_loads
-from typing import Optional
-
-from rich.console import Console
-from rich.table import Table
+from typing import Dict, List, Optional, Tuple, Union
 
 from jhack.config import IS_SNAPPED
 from jhack.helpers import Format, FormatOption
@@ -16,42 +15,112 @@ from jhack.version import get_jhack_version
 NOT_INSTALLED = "Not Installed."
 logger = jhack_logger.getChild(__name__)
 
+# snapd REST API; `select=enabled` has snapd filter out disabled revisions for us.
+SNAPD_SNAPS_URL = "http+unix://%2Frun%2Fsnapd.socket/v2/snaps?select=enabled"
+SNAPD_TIMEOUT = 2  # seconds
+
 
-def get_output(command: str) -> Optional[str]:
+async def _get_output_async(command: str, text: bool = True) -> Optional[Union[str, bytes]]:
     try:
-        p = subprocess.run(command.split(), capture_output=True, text=True)
-        return p.stdout.strip() if p.returncode == 0 else None
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        proc = await asyncio.create_subprocess_exec(
+            *command.split(), stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError as e:
         logger.info(e)
         return None
 
+    stdout, _ = await proc.communicate()
+    if proc.returncode != 0:
+        return None
+    stdout = stdout.strip()
+    # decode the bytes ourselves: no TextIOWrapper on the pipes, and never choke on odd output
+    return stdout.decode("utf-8", errors="replace") if text else stdout
+
+
+def get_output(command: str, text: bool = True) -> Optional[Union[str, bytes]]:
+    return asyncio.run(_get_output_async(command, text=text))
 
+
+@lru_cache
 def get_os_release():
+    os_release = {}
     with open("/etc/os-release") as f:
-        return dict(csv.reader(f, delimiter="="))
+        for line in f:
+            key, sep, value = line.rstrip().partition("=")
+            if sep:
+                os_release[key] = value.strip('"')
+    return os_release
+
+
+@lru_cache
+def _snapd_session():
+    """Shared snapd socket session, so repeated queries reuse the connection."""
+    import requests_unixsocket  # noqa
+
+    return requests_unixsocket.Session()
+
+
+def _fetch_juju_snaps_from_snapd() -> List[Dict[str, str]]:
+    # don't hang forever if snapd is wedged
+    response = _snapd_session().get(SNAPD_SNAPS_URL, timeout=SNAPD_TIMEOUT)
+    response.raise_for_status()
+    return [
+        {
+            "name": snap["name"],
+            "version": snap["version"],
+            "revision": snap["revision"],
+            "channel": snap.get("channel", ""),
+        }
+        for snap in response.json()["result"]
+        if snap["name"].startswith("juju")
+    ]
 
 
-def _gather_juju_snaps_versions(format: Format = FormatOption):
+def _fetch_juju_snaps_from_snap_list() -> List[Dict[str, str]]:
+    local_snaps = []
+    installed_snaps = get_output("snap list", text=False).splitlines()
+    # filter on the raw line first, so we only split (and decode) the rows we care about
+    juju_snaps = (snap for snap in installed_snaps if snap.startswith(b"juju"))
+    for parts in (snap.decode("utf-8").split(maxsplit=4) for snap in juju_snaps):
+        if len(parts) < 4:
+            continue
+        name, version, revision, channel, *_ = parts
+        local_snaps.append(
+            {
+                "name": name,
+                "version": version,
+                "revision": revision,
+                "channel": channel,
+            }
+        )
+    return local_snaps
+
+
+@lru_cache
+def _fetch_juju_snaps() -> Tuple[Dict[str, str], ...]:
+    """Name, version, revision and channel of the locally installed juju* snaps."""
     local_snaps = []
     try:
-        installed_snaps = get_output("snap list").splitlines()
-        juju_snaps = [snap.split() for snap in installed_snaps if snap.startswith("juju")]
-        for name, version, revision, channel, _owner, _notes in juju_snaps:
-            local_snaps.append(
-                {
-                    "name": name,
-                    "version": version,
-                    "revision": revision,
-                    "channel": channel,
-                }
-            )
-    except TypeError as e:
-        logger.error(f"urrlib3/requests lib incompatibility error: {e!r}")
-    except ConnectionError as e:
-        # fixme: remove when snapd-control is integrated
-        logger.error(f"connection error fetching snap info: {e}")
+        try:
+            import requests  # noqa
+
+            local_snaps = _fetch_juju_snaps_from_snapd()
+        except ImportError as e:
+            # requests or requests-unixsocket missing/broken: `snap list` doesn't need them
+            logger.info(f"cannot query snapd ({e!r}); falling back to `snap list`")
+            local_snaps = _fetch_juju_snaps_from_snap_list()
+        except (TypeError, requests.RequestException) as e:
+            # fixme: remove when snapd-control is integrated
+            # TypeError is the urllib3/requests-unixsocket incompatibility
+            logger.info(f"cannot query snapd ({e!r}); falling back to `snap list`")
+            local_snaps = _fetch_juju_snaps_from_snap_list()
     except Exception as e:
         logger.error(f"unexpected exception fetching snap info: {e}")
+    return tuple(local_snaps)
+
+
+def _gather_juju_snaps_versions(format: Format = FormatOption):
+    local_snaps = _fetch_juju_snaps()
 
     versions = {
         snap["name"]: f"{snap['version']} - {snap['revision']} ({snap['channel']})"
@@ -62,6 +131,8 @@ def _gather_juju_snaps_versions(format: Format = FormatOption):
     if format == Format.json:
         return versions
 
+    from rich.table import Table  # noqa
+
     table = Table(show_header=False, show_edge=False, show_lines=False, show_footer=False)
 
     for k, v in versions.items():
@@ -70,17 +141,32 @@ def _gather_juju_snaps_versions(format: Format = FormatOption):
     return table
 
 
-def get_multipass_version():
-    """Multipass --version."""
-    try:
+def get_multipass_version(multipass_version: Optional[str] = None):
+    """Multipass --version (which we fetch if not given)."""
+    if multipass_version is None:
         multipass_version = get_output("multipass version --format json")
-    except subprocess.CalledProcessError:
+    if not multipass_version:
         logger.info("multipass not found")
-        multipass_version = None
     multipass_version = json_loads(multipass_version) if multipass_version else {}
     return multipass_version
 
 
+def get_kernel_version() -> str:
+    """Equivalent of `uname -srp`, without shelling out."""
+    uname = os.uname()
+    return f"{uname.sysname} {uname.release} {uname.machine}"
+
+
+async def _probe_versions():
+    return await asyncio.gather(
+        _get_output_async("multipass version --format json"),
+        # warms up the _fetch_juju_snaps cache
+        asyncio.to_thread(_fetch_juju_snaps),
+        _get_output_async("microk8s version"),
+        _get_output_async("lxd --version"),
+    )
+
+
 def print_env(format: Format = FormatOption):
     """Print the details of the juju environment for use in bug reports."""
     if IS_SNAPPED:
@@ -94,18 +180,20 @@ def print_env(format: Format = FormatOption):
     python_v = sys.version_info
     python_version = f"{python_v.major}.{python_v.minor}.{python_v.micro} ({sys.executable})"
 
-    multipass_version = get_multipass_version()
+    # these all shell out and are independent of each other: run them concurrently
+    multipass, _, microk8s, lxd = asyncio.run(_probe_versions())
+    multipass_version = get_multipass_version(multipass or "")
 
     data = {
         "jhack": get_jhack_version(),
         "python": python_version,
         "juju-* snaps": _gather_juju_snaps_versions(format=format),
-        "microk8s": get_output("microk8s version") or NOT_INSTALLED,
-        "lxd": get_output("lxd --version") or NOT_INSTALLED,
+        "microk8s": microk8s or NOT_INSTALLED,
+        "lxd": lxd or NOT_INSTALLED,
         "multipass": multipass_version.get("multipass", NOT_INSTALLED),
         "multipassd": multipass_version.get("multipassd", NOT_INSTALLED),
         "os": get_os_release()["PRETTY_NAME"],
-        "kernel": get_output("uname -srp"),
+        "kernel": get_kernel_version(),
     }
 
     if format == Format.json:
@@ -113,6 +201,9 @@ def print_env(format: Format = FormatOption):
         print(jsn)
 
     else:
+        from rich.console import Console  # noqa
+        from rich.table import Table  # noqa
+
         table = Table(title="juju info v0.1", show_header=False)
         for k, v in data.items():
             table.add_row(k, v)
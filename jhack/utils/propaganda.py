@@ -1,30 +1,23 @@
 """Tools to mess with leadership."""
 
-import shlex
-import signal
-from contextlib import contextmanager
+import asyncio
+import re
+from base64 import b64decode, b64encode
+from functools import lru_cache
+from hashlib import sha256
 from pathlib import Path
-from time import sleep
-from typing import Optional
+from subprocess import PIPE
+from time import monotonic, sleep
+from typing import Dict, List, Literal, Optional
 
 import typer
-from rich.align import Align
-from rich.console import Console
-from rich.live import Live
-from rich.spinner import Spinner
-from rich.style import Style
-from rich.text import Text
 
 from jhack.conf.conf import CONFIG, check_destructive_commands_allowed
 from jhack.helpers import (
-    JPopen,
     Target,
     get_leader_unit,
     get_substrate,
     get_units,
-    push_file,
-    push_string,
-    rm_file,
 )
 from jhack.logger import logger as jhack_logger
 
@@ -40,27 +33,28 @@ CROWN = r"""
 """
 
 
-def _patch_machine(
-    apply: bool,
-    unit: Target,
-    model: Optional[str],
-    dry_run: bool = False,
-):
-    systemctl_cmd = (
-        f"sudo systemctl {'start' if apply else 'stop'} jujud-machine-{unit.machine_id}.service"
-    )
-    _model = f" {model}" if model else ""
-    cmd = f"juju ssh{_model} {unit.unit_name} {systemctl_cmd}"
-    logger.debug(f"stopping {unit} with {cmd}")
+def _patch_machine_cmd(apply: bool, unit: Target, model: Optional[str] = None) -> List[str]:
+    model_args = ["-m", model] if model else []
+    return [
+        "juju",
+        "ssh",
+        *model_args,
+        unit.unit_name,
+        "sudo",
+        "systemctl",
+        "start" if apply else "stop",
+        f"jujud-machine-{unit.machine_id}.service",
+    ]
 
-    if dry_run:
-        print(f"would run: {cmd}")
-        return
 
-    JPopen(shlex.split(cmd))
+LEADER_POLL_MIN_DELAY = 0.25
+LEADER_POLL_MAX_DELAY = 2.0
 
 
-def _wait_for_leader(unit, dry_run: bool = False):
+def _wait_for_leader(unit, model: Optional[str] = None, dry_run: bool = False):
+    from rich.live import Live  # noqa
+    from rich.spinner import Spinner  # noqa
+
     try:
         with Live(
             Spinner(
@@ -71,12 +65,27 @@ def _wait_for_leader(unit, dry_run: bool = False):
         ):
             # is the unit we want to elect leader already?
             def current_leader_name():
-                leader = get_leader_unit(unit.app)
+                leader = get_leader_unit(unit.app, model=model)
                 # there is a brief moment of time in which there is no leader at all.
                 return leader.unit_name if leader else None
 
-            while not current_leader_name() == unit.unit_name:
-                sleep(0.5)
+            # back off exponentially: elections are often quick, but can take a while.
+            # Never poll more often than juju status can keep up with, and start over
+            # whenever leadership changes hands, since that's when things are moving.
+            delay = LEADER_POLL_MIN_DELAY
+            last_leader = None
+            while True:
+                start = monotonic()
+                leader = current_leader_name()
+                status_latency = monotonic() - start
+                if leader == unit.unit_name:
+                    break
+                if leader != last_leader:
+                    delay = LEADER_POLL_MIN_DELAY
+                last_leader = leader
+                delay = min(max(delay, 1.5 * status_latency), LEADER_POLL_MAX_DELAY)
+                sleep(delay)
+                delay *= 1.5
 
     except KeyboardInterrupt:
         if dry_run:
@@ -86,27 +95,6 @@ def _wait_for_leader(unit, dry_run: bool = False):
             exit("aborted. Warning: your units might be somewhat confused.")
 
 
-class TimeoutException(Exception):
-    pass
-
-
-@contextmanager
-def timeout(seconds, raise_=False):
-    def signal_handler(signum, frame):
-        raise TimeoutException("Timed out!")
-
-    signal.signal(signal.SIGALRM, signal_handler)
-    signal.alarm(seconds)
-    try:
-        yield
-    except TimeoutException as e:
-        if raise_:
-            raise e
-        return None
-    finally:
-        signal.alarm(0)
-
-
 JHACK_MOCK_SERVER_LOCAL_PATH = Path(__file__).parent / "mock_health_server" / "server.py"
 assert JHACK_MOCK_SERVER_LOCAL_PATH.exists(), JHACK_MOCK_SERVER_LOCAL_PATH
 
@@ -153,44 +141,66 @@ CHECKS_LAYER = """checks:
 THRESH_HIGH = 100501
 THRESH_LOW = 3
 LAYER_REMOTE_PATH = "/.jhack-layer-checks-tmp.yaml"
+# how long a single unit gets to (un)patch itself before we give up on it
+PATCH_TIMEOUT = 60
+# how long a unit gets to answer a no-op ssh before we consider it unreachable
+PREFLIGHT_TIMEOUT = 5
+
+
+def _write_file_cmd(content: bytes, remote_path: str) -> str:
+    """Shell command writing some content to a remote file, safe to embed in double quotes."""
+    return f"echo {b64encode(content).decode('ascii')} | base64 -d > {remote_path}"
+
 
+# matches what _write_file_cmd produces, so dry runs can show it without the payload
+_WRITE_FILE_CMD_RE = re.compile(r"echo ([A-Za-z0-9+/=]+) \| base64 -d > ([^\s)]+)")
 
-def _patch_k8s(
+
+def _redact_payloads(cmd: str) -> str:
+    """Replace the base64 payloads in a command with a short placeholder."""
+
+    def _placeholder(match: re.Match) -> str:
+        payload, remote_path = match.groups()
+        size = len(b64decode(payload))
+        return f"echo <{Path(remote_path).name}, {size} bytes> | base64 -d > {remote_path}"
+
+    return _WRITE_FILE_CMD_RE.sub(_placeholder, cmd)
+
+
+@lru_cache
+def _mock_server_write_cmd() -> str:
+    """Shell command shipping the mock server to a unit, unless it's already there."""
+    source = JHACK_MOCK_SERVER_LOCAL_PATH.read_bytes()
+    digest = sha256(source).hexdigest()
+    is_up_to_date = (
+        f"echo {digest}  {JHACK_MOCK_SERVER_REMOTE_PATH} | sha256sum -c --status 2>/dev/null"
+    )
+    return f"({is_up_to_date} || {_write_file_cmd(source, JHACK_MOCK_SERVER_REMOTE_PATH)})"
+
+
+# the layers only depend on whether we're applying or lifting the patch: render them once
+_APPLY_LAYER = (MOCK_SERVER_LAYER + CHECKS_LAYER).format(threshold=THRESH_HIGH)
+_LIFT_LAYER = CHECKS_LAYER.format(threshold=THRESH_LOW)
+_APPLY_LAYER_WRITE_CMD = _write_file_cmd(_APPLY_LAYER.encode(), LAYER_REMOTE_PATH)
+_LIFT_LAYER_WRITE_CMD = _write_file_cmd(_LIFT_LAYER.encode(), LAYER_REMOTE_PATH)
+
+
+def _patch_k8s_cmd(
     apply: bool,
     unit: str,
     model: Optional[str] = None,
-    dry_run: bool = False,
     cleanup: bool = False,
-):
-    logger.info(("applying" if apply else "lifting") + f" pebble patch on {unit}")
+) -> List[str]:
+    logger.debug(("applying" if apply else "lifting") + f" pebble patch on {unit}")
     threshold = THRESH_HIGH if apply else THRESH_LOW
     # todo: do we even need to set the liveness check threshold, now that we mock the servers?
     logger.debug(f"setting pebble liveness check threshold to {threshold}")
 
+    # everything happens in a single ssh session: files are shipped inline, base64-encoded
+    steps = [_APPLY_LAYER_WRITE_CMD if apply else _LIFT_LAYER_WRITE_CMD]
     if apply:
-        layer = MOCK_SERVER_LAYER + CHECKS_LAYER
-    else:
-        layer = CHECKS_LAYER
-
-    push_string(
-        unit,
-        layer.format(threshold=threshold),
-        remote_path=LAYER_REMOTE_PATH,
-        is_full_path=True,
-        model=model,
-        dry_run=dry_run,
-    )
-
-    if apply:
-        logger.debug("pushing mock server source...")
-        push_file(
-            unit,
-            JHACK_MOCK_SERVER_LOCAL_PATH,
-            JHACK_MOCK_SERVER_REMOTE_PATH,
-            is_full_path=True,
-            model=model,
-            dry_run=dry_run,
-        )
+        logger.debug("shipping mock server source...")
+        steps.append(_mock_server_write_cmd())
 
     logger.debug(f"adding layer and {'starting' if apply else 'killing'} mock server...")
 
@@ -204,35 +214,92 @@ def _patch_k8s(
     server_cmd_k8s = (
         f"/charm/bin/pebble {'start' if apply else 'stop'} {MOCK_SERVER_SERVICE_NAME_K8S}"
     )
-    cmd = [
-        "juju",
-        "ssh",
-        unit,
-        "bash",
-        "-c",
-        f'"{add_layer} && {containeragent_cmd} && {server_cmd_pebble} && {server_cmd_k8s}"',
-    ]
-    JPopen(cmd, wait=True)
+    script = " && ".join(
+        steps + [add_layer, containeragent_cmd, server_cmd_pebble, server_cmd_k8s]
+    )
 
     if cleanup:
         logger.debug("cleaning up layer file...")
-        rm_file(
-            unit,
-            remote_path=LAYER_REMOTE_PATH,
-            is_path_relative=False,
-            model=model,
-            dry_run=dry_run,
-        )
+        # cleanup regardless of whether the patch went through
+        script += f"; rm -f {LAYER_REMOTE_PATH}"
         # if lifting the patch, we can also remove the server
         if not apply:
             logger.debug("cleaning up server file...")
-            rm_file(
-                unit,
-                remote_path=JHACK_MOCK_SERVER_REMOTE_PATH,
-                is_path_relative=False,
-                model=model,
-                dry_run=dry_run,
-            )
+            script += f" {JHACK_MOCK_SERVER_REMOTE_PATH}"
+
+    model_args = ["-m", model] if model else []
+    return ["juju", "ssh", *model_args, unit, "bash", "-c", f'"{script}"']
+
+
+async def _run_patch_cmd(
+    unit: Target, cmd: List[str], timeout: float, action: str = "patching"
+) -> bool:
+    """Run a patch command for a unit; return whether it succeeded within the timeout."""
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=PIPE, stderr=PIPE)
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        logger.error(f"{action} {unit.unit_name} timed out after {timeout}s")
+        return False
+
+    if proc.returncode != 0:
+        logger.error(
+            f"{action} {unit.unit_name} failed with code {proc.returncode}: "
+            f"{stderr.decode('utf-8', errors='replace')}"
+        )
+        return False
+    return True
+
+
+async def _run_patch_cmds(
+    cmds: Dict[Target, List[str]], timeout: float, action: str = "patching"
+) -> List[Target]:
+    results = await asyncio.gather(
+        *(_run_patch_cmd(unit, cmd, timeout, action) for unit, cmd in cmds.items())
+    )
+    return [unit for unit, ok in zip(cmds, results) if ok]
+
+
+def _probe_units(
+    units: List[Target], model: Optional[str] = None, timeout: float = PREFLIGHT_TIMEOUT
+) -> List[Target]:
+    """Check that we can ssh into all units (concurrently); return the unreachable ones."""
+    model_args = ["-m", model] if model else []
+    cmds = {unit: ["juju", "ssh", *model_args, unit.unit_name, "true"] for unit in units}
+    reachable = asyncio.run(_run_patch_cmds(cmds, timeout, action="probing"))
+    return [unit for unit in units if unit not in reachable]
+
+
+def _patch_units(
+    apply: bool,
+    units: List[Target],
+    substrate: Literal["k8s", "machine"],
+    model: Optional[str] = None,
+    dry_run: bool = False,
+    cleanup: bool = False,
+    timeout: float = PATCH_TIMEOUT,
+) -> List[Target]:
+    """Apply or lift the patch on all units concurrently; each unit is a separate ssh round-trip.
+
+    Returns the units that were successfully patched.
+    """
+    logger.info(("applying" if apply else "lifting") + f" patch on {len(units)} units")
+    if substrate == "k8s":
+        cmds = {
+            unit: _patch_k8s_cmd(apply, unit.unit_name, model=model, cleanup=cleanup)
+            for unit in units
+        }
+    else:
+        cmds = {unit: _patch_machine_cmd(apply, unit, model=model) for unit in units}
+
+    if dry_run:
+        for cmd in cmds.values():
+            print(f"would run: {_redact_payloads(' '.join(cmd))}")
+        return list(units)
+
+    return asyncio.run(_run_patch_cmds(cmds, timeout))
 
 
 def _leader_set(target: Target, model: Optional[str] = None, cleanup=True, dry_run: bool = False):
@@ -262,28 +329,38 @@ def _leader_set(target: Target, model: Optional[str] = None, cleanup=True, dry_r
 
     murderable_units = [u for u in units if u.unit_name != target.unit_name]
 
-    # lobotomize all units except the prospective leader
-    for unit in murderable_units:
-        if substrate == "k8s":
-            _patch_k8s(True, unit=unit.unit_name, model=model, dry_run=dry_run)
-        else:
-            _patch_machine(True, unit=unit, model=model, dry_run=dry_run)
-
-    # block until new leader is elected
-    _wait_for_leader(target, dry_run=dry_run)
-
-    # then resurrect all units
-    for unit in murderable_units:
-        if substrate == "k8s":
-            _patch_k8s(
-                False,
-                unit=unit.unit_name,
-                model=model,
-                dry_run=dry_run,
-                cleanup=cleanup,
+    # fail fast if we can't reach some unit, before we've broken anything
+    if not dry_run:
+        unreachable = _probe_units(murderable_units, model=model)
+        if unreachable:
+            exit(
+                f"cannot reach {', '.join(u.unit_name for u in unreachable)}; "
+                f"aborting before any unit is patched."
             )
-        else:
-            _patch_machine(False, unit=unit, model=model, dry_run=dry_run)
+
+    try:
+        # lobotomize all units except the prospective leader
+        patched = _patch_units(True, murderable_units, substrate, model=model, dry_run=dry_run)
+        patched_names = {u.unit_name for u in patched}
+        unpatched = [u.unit_name for u in murderable_units if u.unit_name not in patched_names]
+        if unpatched:
+            # an unpatched unit can keep (or take) leadership: no point in waiting
+            exit(f"failed to patch {', '.join(unpatched)}; aborting.")
+
+        # block until new leader is elected
+        _wait_for_leader(target, model=model, dry_run=dry_run)
+
+    finally:
+        # then resurrect all units, also if something went wrong (or we got interrupted)
+        # halfway through: a unit whose patch failed or timed out may still be half-patched
+        _patch_units(
+            False, murderable_units, substrate, model=model, dry_run=dry_run, cleanup=cleanup
+        )
+
+    from rich.align import Align  # noqa
+    from rich.console import Console  # noqa
+    from rich.style import Style  # noqa
+    from rich.text import Text  # noqa
 
     console = Console()
     console.print(
@@ -1,9 +1,10 @@
 import asyncio
 import dataclasses
 import json
-import re
 import sys
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from functools import lru_cache
@@ -18,6 +19,7 @@ from jhack.helpers import (
     FormatUnavailable,
     JPopen,
     RichSupportedColorOptions,
+    json_loads,
     juju_status,
 )
 from jhack.logger import logger
@@ -27,11 +29,13 @@ logger = logger.getChild(__file__)
 _CACHING = True
 """Toggle caching for juju api calls."""
 
-_JUJU_DATA_CACHE = {}
+# bounds for the (adaptive) refresh interval in watch mode, in seconds
+WATCH_MIN_INTERVAL = 0.5
+WATCH_MAX_INTERVAL = 5.0
 
-_JUJU_KEYS = ("egress-subnets", "ingress-address", "private-address")
-_UNIT_ID_RE = re.compile(r"/\d")
-_RELATIONS_RE = re.compile(r"([\w\-]+):([\w\-]+)\s+([\w\-]+):([\w\-]+)\s+([\w\-]+)\s+([\w\-]+).*")
+_JUJU_KEYS = frozenset(("egress-subnets", "ingress-address", "private-address"))
+# header of the relations table in the tabular `juju status` output (juju 2.9 / 3.x)
+_RELATIONS_HEADERS = ("Relation provider", "Integration provider")
 
 
 class RelationType(str, Enum):
@@ -41,7 +45,7 @@ class RelationType(str, Enum):
     cross_model = "cross_model"
 
 
-@dataclass
+@dataclass(slots=True)
 class Relation:
     provider: str
     provider_endpoint: str
@@ -57,21 +61,16 @@ class Relation:
 
 class RelationEndpointURL(str):
     # a string in the format APP_NAME:ENDPOINT_NAME
+    __slots__ = ("app_name", "unit_id", "endpoint")
+
     def __init__(self, s):
         super().__init__()
-        if ":" in s:
-            u, endpoint = s.split(":")
-        else:
-            u, endpoint = s, None
-
-        if "/" in u:
-            app_name, unit_id = u.split("/")
-        else:
-            app_name, unit_id = u, None
+        u, _, endpoint = s.partition(":")
+        app_name, _, unit_id = u.partition("/")
 
         self.app_name = app_name
-        self.unit_id = unit_id
-        self.endpoint = endpoint
+        self.unit_id = unit_id or None
+        self.endpoint = endpoint or None
 
     @property
     def unit_name(self):
@@ -86,8 +85,11 @@ class RelationEndpointURL(str):
         return f"{self.app_name}:{self.endpoint}"
 
     def with_unit_id(self, unit_id: int) -> "RelationEndpointURL":
-        ep = RelationEndpointURL(str(self))
+        # copy the parsed fields over instead of parsing the string again
+        ep = str.__new__(RelationEndpointURL, self)
+        ep.app_name = self.app_name
         ep.unit_id = unit_id
+        ep.endpoint = self.endpoint
         return ep
 
 
@@ -95,22 +97,33 @@ class InterfaceNotFoundError(RuntimeError):
     pass
 
 
-def purge(data: dict):
-    for key in _JUJU_KEYS:
-        if key in data:
-            del data[key]
+def purge(data: dict) -> dict:
+    """Return a copy of data without the keys juju sets on every unit databag.
+
+    Does not mutate data, as it may be (part of) a cached show-unit output.
+    """
+    return {key: value for key, value in data.items() if key not in _JUJU_KEYS}
 
 
 @lru_cache
-def _cached_juju_status(*args, **kwargs):
-    return juju_status(*args, **kwargs)
+def _cached_juju_status(model: Optional[str], json: bool):
+    return juju_status(model=model, json=json)
 
 
-def _juju_status(*args, **kwargs):
+def _juju_status(model: str = None, json: bool = False):
     # to facilitate mocking in utests
     if _CACHING:
-        return _cached_juju_status(*args, **kwargs)
-    return juju_status(*args, **kwargs)
+        # always pass the args positionally, so that `_juju_status(json=True)` and
+        # `_juju_status(model=None, json=True)` hit the same cache entry.
+        return _cached_juju_status(model, json)
+    return juju_status(model=model, json=json)
+
+
+def _clear_caches():
+    """Forget all cached juju status and show-unit output."""
+    _cached_juju_status.cache_clear()
+    _cached_get_unit_info.cache_clear()
+    _cached_get_metadata.cache_clear()
 
 
 def _show_unit(unit_name, related_to: str = None, endpoint: str = None, model: str = None):
@@ -123,13 +136,15 @@ def _show_unit(unit_name, related_to: str = None, endpoint: str = None, model: s
         args.extend(["--endpoint", endpoint])
     args.append(unit_name)
     proc = JPopen(args)
-    raw = proc.stdout.read().decode("utf-8").strip()
-    return json.loads(raw)
+    # communicate() also reaps the process; json_loads takes the raw bytes just fine
+    raw, _ = proc.communicate()
+    # no output: let _get_unit_info complain about the unit name instead of json
+    return json_loads(raw) if raw.strip() else {}
 
 
 def _find_model_if_CMR(app_name, current_model: str = None):
     """Find out if app_name is in current_model, if not, return the SAAS-exposed model it is in."""
-    status = _juju_status(json=True)
+    status = _juju_status(model=current_model, json=True)
     if app_name not in status["applications"]:
         logger.info(
             f"app_name {app_name!r} not found in "
@@ -267,14 +282,14 @@ def get_relation_by_endpoint(
     return matches[0]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Metadata:
     scale: int
     units: Tuple[int, ...]
     leader_id: int
 
 
-@dataclass
+@dataclass(slots=True)
 class AppRelationData:
     url: RelationEndpointURL
     relation_id: int
@@ -287,29 +302,27 @@ class AppRelationData:
     other_model: str = None
 
 
-def get_metadata_from_status(
-    endpoint: RelationEndpointURL,
-    model: str = None,
-):
+def _get_metadata(app_name: str, model: Optional[str]) -> Metadata:
     status = _juju_status(model=model, json=True)
     # machine status json output apparently has no 'scale'... -_-
-    app_status = status["applications"][endpoint.app_name]
-    if app_status.get("subordinate-to"):
+    app_status = status["applications"][app_name]
+    if primaries := app_status.get("subordinate-to"):
         units = {}
-        # todo: need to scavenge unit names from OTHER units' .subordinates field
-        for app in status["applications"].values():
-            for unit in app.get("units", {}).values():
-                if subs := unit.get("subordinates"):
-                    for subn, subv in subs.items():
-                        if subn.startswith(endpoint.app_name):
-                            units[subn] = subv
+        # subordinate units are only listed under their primaries' units:
+        # no need to look at any other app.
+        for primary in primaries:
+            primary_status = status["applications"].get(primary, {})
+            for unit in primary_status.get("units", {}).values():
+                for subn, subv in unit.get("subordinates", {}).items():
+                    if subn.partition("/")[0] == app_name:
+                        units[subn] = subv
 
     elif app_status.get("units"):
         units = app_status["units"]
 
     else:
         raise ValueError(
-            f"App {endpoint.app_name} has no units; is this a disintegrated "
+            f"App {app_name} has no units; is this a disintegrated "
             f"subordinate or an app that is not done deploying yet?"
         )
 
@@ -335,6 +348,21 @@ def get_metadata_from_status(
     return Metadata(scale, tuple(unit_ids), leader_id)
 
 
+@lru_cache
+def _cached_get_metadata(app_name: str, model: Optional[str]) -> Metadata:
+    return _get_metadata(app_name, model)
+
+
+def get_metadata_from_status(
+    endpoint: RelationEndpointURL,
+    model: str = None,
+) -> Metadata:
+    # the same apps show up over and over when walking all relations (see `jhack record`)
+    if _CACHING:
+        return _cached_get_metadata(endpoint.app_name, model)
+    return _get_metadata(endpoint.app_name, model)
+
+
 def get_units_and_meta(
     endpoint: RelationEndpointURL,
     model: str = None,
@@ -362,6 +390,17 @@ def get_content(
     # to find out what units there are.
     status = _juju_status(model=model, json=True)
     units, meta = get_units_and_meta(obj, model)
+    if not units:
+        # e.g. scaled to 0: there are no databags to look up
+        return AppRelationData(
+            url=obj,
+            meta=meta,
+            application_data=None,
+            units_data={},
+            relation_id=None,
+            model=model,
+            other_model=other_model,
+        )
 
     if other_model != model:
         logger.info(f"other app is in model {other_model!r}. Pulling status...")
@@ -431,30 +470,30 @@ def get_content(
             relation,
         )
         if not include_default_juju_keys:
-            for unit_data in units_data.values():
-                purge(unit_data)
+            units_data = {unit: purge(unit_data) for unit, unit_data in units_data.items()}
 
     elif relation.type in [
         RelationType.regular,
         RelationType.subordinate,
         RelationType.cross_model,
     ]:
+        # all our units' databags are visible from the same remote unit, in the same
+        # relation-info entry: look it up once, then pick out each unit's databag.
+        raw_data = _get_raw_relation_data(
+            obj.with_unit_id(units[0]),
+            other_obj.with_unit_id(other_unit_id),  # any unit will do
+            other_model=other_model,
+            relation=relation,
+        )
+        app_data = raw_data.get("application-data", {})
+        r_id = raw_data["relation-id"]
+
         units_data = {}
-        r_id = None
         for unit_id in units:
             obj_with_uid = obj.with_unit_id(unit_id)
-            unit_data, app_data, r_id_ = get_databags(
-                obj_with_uid,
-                other_obj.with_unit_id(other_unit_id),  # any unit will do
-                other_model=other_model,
-                relation=relation,
-            )
-
-            if r_id is not None:
-                assert r_id == r_id_, f"mismatching relation IDs: {r_id, r_id_}"
-            r_id = r_id_
+            unit_data = _get_unit_databag(raw_data, obj_with_uid, relation)
             if not include_default_juju_keys:
-                purge(unit_data)
+                unit_data = purge(unit_data)
             units_data[obj_with_uid.unit_name] = unit_data
 
     else:
@@ -470,16 +509,13 @@ def get_content(
     )
 
 
-def get_databags(
+def _get_raw_relation_data(
     obj: RelationEndpointURL,
     other_obj: RelationEndpointURL,
     relation: "Relation",
     other_model: str = None,
-):
-    """Gets the databags of local unit and its leadership status.
-
-    Given a remote unit and the remote endpoint name.
-    """
+) -> dict:
+    """Get the relation-info entry for this relation from the remote unit's show-unit output."""
     data = get_unit_info(
         other_obj.unit_name,
         # obj.unit_name,
@@ -490,15 +526,19 @@ def get_databags(
     if not relations:
         sys.exit(f"{other_obj} has no relations, or the unit is still allocating.")
 
-    raw_data = get_relation_by_endpoint(
+    return get_relation_by_endpoint(
         relations,
         obj,
         other_obj,
         relation,
     )
+
+
+def _get_unit_databag(raw_data: dict, obj: RelationEndpointURL, relation: "Relation"):
+    """Extract the databag(s) of the local unit from a relation-info entry."""
     if relation.type == RelationType.peer:
         # we can grab them all in a single call.
-        unit_data = {
+        return {
             obj.unit_name: raw_data["local-unit"]["data"],
             **{
                 u: raw_data["related-units"][u]["data"]
@@ -508,15 +548,27 @@ def get_databags(
     elif relation.type == RelationType.cross_model:
         # assert raw_data.get("cross-model", False)
         # has 'cross-model' gone from the data at some point?
-        unit_data = raw_data["local-unit"]["data"] or {}
-    else:
-        unit_data = raw_data["related-units"][obj.unit_name]["data"]
+        return raw_data["local-unit"]["data"] or {}
+    return raw_data["related-units"][obj.unit_name]["data"]
+
+
+def get_databags(
+    obj: RelationEndpointURL,
+    other_obj: RelationEndpointURL,
+    relation: "Relation",
+    other_model: str = None,
+):
+    """Gets the databags of local unit and its leadership status.
 
+    Given a remote unit and the remote endpoint name.
+    """
+    raw_data = _get_raw_relation_data(obj, other_obj, relation, other_model=other_model)
+    unit_data = _get_unit_databag(raw_data, obj, relation)
     app_data = raw_data.get("application-data", {})
     return unit_data, app_data, raw_data["relation-id"]
 
 
-@dataclass
+@dataclass(slots=True)
 class RelationData:
     provider: AppRelationData
     requirer: AppRelationData
@@ -553,37 +605,67 @@ def get_relation_data(
     >>> get_relation_data('prometheus:ingress', 'traefik')
     >>> get_relation_data('prometheus', 'traefik')
     """
-    provider_data = get_content(
-        provider_endpoint,
-        requirer_endpoint,
-        relation,
-        include_default_juju_keys,
-        model=_find_model_if_CMR(provider_endpoint.app_name, current_model=model),
-        other_model=_find_model_if_CMR(requirer_endpoint.app_name, current_model=model),
-    )
-    requirer_data = get_content(
-        requirer_endpoint,
-        provider_endpoint,
-        relation,
-        include_default_juju_keys,
-        model=provider_data.other_model,
-        other_model=provider_data.model,
-    )
-    return RelationData(provider=provider_data, requirer=requirer_data)
-
+    provider_model = _find_model_if_CMR(provider_endpoint.app_name, current_model=model)
+    requirer_model = _find_model_if_CMR(requirer_endpoint.app_name, current_model=model)
+
+    # the two sides are independent, and each is mostly waiting on juju: fetch them concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        provider_data = executor.submit(
+            get_content,
+            provider_endpoint,
+            requirer_endpoint,
+            relation,
+            include_default_juju_keys,
+            model=provider_model,
+            other_model=requirer_model,
+        )
+        requirer_data = executor.submit(
+            get_content,
+            requirer_endpoint,
+            provider_endpoint,
+            relation,
+            include_default_juju_keys,
+            model=requirer_model,
+            other_model=provider_model,
+        )
+    return RelationData(provider=provider_data.result(), requirer=requirer_data.result())
 
-def get_relations(model: str = None) -> List[Relation]:
-    status = _juju_status(model=model)
-    # get the interface name from juju status.
-    raw_relations = _RELATIONS_RE.findall(status)
 
+def _parse_relations_table(status: str) -> List[Relation]:
+    """Parse the relations table out of the tabular `juju status` output."""
     relations = []
-    for groups in raw_relations:
-        relations.append(Relation(*groups))
-
+    in_table = False
+    for line in status.splitlines():
+        line = line.strip()
+        if not in_table:
+            in_table = line.startswith(_RELATIONS_HEADERS)
+            continue
+        if not line:
+            # end of the table
+            break
+
+        # provider:endpoint requirer:endpoint interface type [message]
+        fields = line.split(maxsplit=4)
+        if len(fields) < 4 or ":" not in fields[0] or ":" not in fields[1]:
+            logger.debug(f"skipping unexpected relation line {line!r}")
+            continue
+        provider, _, provider_endpoint = fields[0].partition(":")
+        requirer, _, requirer_endpoint = fields[1].partition(":")
+        relations.append(
+            Relation(
+                provider, provider_endpoint, requirer, requirer_endpoint, fields[2], fields[3]
+            )
+        )
     return relations
 
 
+def get_relations(model: str = None) -> List[Relation]:
+    # the json status doesn't tell us the interface names nor who is provider/requirer,
+    # so we get them from the tabular juju status.
+    # We only look at the relations table instead of regex-scanning the whole status.
+    return _parse_relations_table(_juju_status(model=model))
+
+
 def _render_unit(obj: Optional[Tuple[int, Dict]], source: AppRelationData):
     unit_name, unit_data = obj
     unit_id = int(unit_name.split("/")[1])
@@ -603,8 +685,8 @@ def _render_databag(unit_name, dct, leader=False, hide_empty_databags: bool = Fa
         t = Table(box=None)
         t.add_column(style="cyan not bold")  # keys
         t.add_column(style="white not bold")  # values
-        for key in sorted(dct.keys()):
-            t.add_row(key, dct[key])
+        for key, value in sorted(dct.items()):
+            t.add_row(key, value)
 
     if leader:
         title = unit_name + "*"
@@ -683,7 +765,15 @@ def _coalesce_endpoint_and_n(
 
     found: List[Relation] = []
 
+    # any match involves ep_url_1's app (as provider, requirer or peer):
+    # only look at the relations of that app.
+    relations_by_app: Dict[str, List[Relation]] = defaultdict(list)
     for relation in relations:
+        relations_by_app[relation.provider].append(relation)
+        if relation.requirer != relation.provider:
+            relations_by_app[relation.requirer].append(relation)
+
+    for relation in relations_by_app.get(ep_url_1.app_name, ()):
         match, flip = _match_endpoint(relation, ep_url_1, ep_url_2)
         if match:
             found.append(relation)
@@ -914,15 +1004,9 @@ def _rich_format_table(
         ),
     )
 
-    unit_databags = []
-
-    for i, entity in enumerate(entities):
-        units = entity.units_data.items()
-        if len(unit_databags) < (i + 1):
-            unit_databags.append([])
-        bucket = unit_databags[i]
-        for _, (unit, data) in enumerate(units):
-            bucket.append(_render_unit((unit, data), entity))
+    unit_databags = [
+        [_render_unit(item, entity) for item in entity.units_data.items()] for entity in entities
+    ]
 
     if any(any(x) for x in unit_databags):
         table.add_row("unit data", *(Columns(x) for x in unit_databags))
@@ -930,6 +1014,17 @@ def _rich_format_table(
     return table
 
 
+def _watch_interval(render_time: float, interval: Optional[float] = None) -> float:
+    """How long a watch-mode refresh should take, in seconds.
+
+    Unless the user asked for a fixed interval, poll juju a bit less often than it takes
+    to answer: fast models refresh quickly, slow ones aren't hammered.
+    """
+    if interval is not None:
+        return interval
+    return min(WATCH_MAX_INTERVAL, max(WATCH_MIN_INTERVAL, render_time * 1.5))
+
+
 def sync_show_relation(
     endpoint1: str = typer.Argument(
         None,
@@ -960,6 +1055,13 @@ def sync_show_relation(
         False, "--hide-empty", "-h", help="Do not show empty databags."
     ),
     watch: bool = typer.Option(False, "-w", "--watch", help="Keep watching for changes."),
+    interval: Optional[float] = typer.Option(
+        None,
+        "--interval",
+        help="In watch mode, seconds between refreshes. "
+        "Defaults to adapting to how long juju takes to respond.",
+    ),
+    pager: bool = typer.Option(False, "--pager", help="Page the output (ignored in watch mode)."),
     model: str = typer.Option(None, "-m", "--model", help="Which model to look into."),
     color: Optional[str] = ColorOption,
     format: Format = FormatOption,
@@ -985,6 +1087,8 @@ def sync_show_relation(
         show_juju_keys=show_juju_keys,
         hide_empty_databags=hide_empty_databags,
         watch=watch,
+        interval=interval,
+        pager=pager,
         model=model,
         color=color,
         format=format,
@@ -999,25 +1103,22 @@ def _sync_show_relation(
     hide_empty_databags: bool = False,
     model: str = None,
     watch: bool = False,
+    interval: Optional[float] = None,
+    pager: bool = False,
     color: RichSupportedColorOptions = "auto",
     format: FormatOption = "auto",
 ):
-    try:
-        import rich  # noqa
-    except ImportError:
-        print("using this command requires rich.")
-        return
-
-    from rich.console import Console
+    from rich.console import Console  # noqa
 
     if color == "no":
         color = None
     console = Console(color_system=color)
 
-    while True:
-        start = time.time()
-
-        table = asyncio.run(
+    def render():
+        # each refresh gets a fresh view of the model, but within a single refresh
+        # all the (many) status and show-unit lookups share a cache.
+        _clear_caches()
+        return loop.run_until_complete(
             render_relation(
                 endpoint1,
                 endpoint2,
@@ -1029,25 +1130,39 @@ def _sync_show_relation(
             )
         )
 
-        if table is None:
-            return
-
-        if watch:
-            global _CACHING
-            _CACHING = False
-            logger.info("running in watch-mode: caching DISABLED")
-
-            elapsed = time.time() - start
-            if elapsed < 1:
-                time.sleep(1.5 - elapsed)
-                _JUJU_DATA_CACHE.clear()
-            # we clear RIGHT BEFORE printing to prevent flickering
-            console.clear()
-        console.print(table)
-
+    # in watch mode we render over and over: reuse the same event loop for all refreshes
+    loop = asyncio.new_event_loop()
+    try:
         if not watch:
+            table = render()
+            if table is None:
+                return
+            if pager:
+                # large relations can be way taller than the terminal
+                with console.pager(styles=True):
+                    console.print(table)
+            else:
+                console.print(table)
             return
 
+        from rich.live import Live  # noqa
+
+        # Live redraws the table in place, so we don't have to clear the whole screen
+        with Live(console=console, auto_refresh=False) as live:
+            while True:
+                start = time.monotonic()
+                table = render()
+                if table is None:
+                    return
+
+                # show the table as soon as it's ready, and wait *after* printing:
+                # sleeping before would only make the data we show older.
+                live.update(table, refresh=True)
+                elapsed = time.monotonic() - start
+                time.sleep(max(0.0, _watch_interval(elapsed, interval) - elapsed))
+    finally:
+        loop.close()
+
 
 if __name__ == "__main__":
     _sync_show_relation(
@@ -1,11 +1,13 @@
+import re
+from functools import lru_cache
 from importlib import metadata
 from importlib.metadata import PackageNotFoundError
 
-import toml
-
 from jhack.conf.conf import check_destructive_commands_allowed
 from jhack.config import JHACK_PROJECT_ROOT
 
+_PYPROJECT_VERSION_RE = re.compile(r'^version\s*=\s*"([^"]+)"', re.MULTILINE)
+
 
 def print_jhack_version():
     """Print the currently installed jhack version and exit."""
@@ -13,6 +15,7 @@ def print_jhack_version():
     print(f"jhack {get_jhack_version()}{' --DEVMODE--' if is_devmode else ''}")
 
 
+@lru_cache
 def get_jhack_version():
     try:
         jhack_version = metadata.version("jhack")
@@ -20,9 +23,9 @@ def get_jhack_version():
         # jhack not installed but being used from sources:
         pyproject = JHACK_PROJECT_ROOT / "pyproject.toml"
         if pyproject.exists():
-            jhack_version = (
-                toml.load(pyproject).get("project", {}).get("version", "<unknown version>")
-            )
+            # no need to parse the whole toml for one line
+            match = _PYPROJECT_VERSION_RE.search(pyproject.read_text())
+            jhack_version = match.group(1) if match else "<unknown version>"
         else:
             jhack_version = "<unknown version>"
     return jhack_version